@@ -4,18 +4,125 @@ Flask Web Application - Clinical Documentation Assistant
 """
 
 
-from flask import Flask, render_template, request, jsonify
-from datetime import datetime
-import json
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context
+from flask.json.provider import DefaultJSONProvider, JSONProvider
+import orjson
 import os
+import threading
+import time
+from collections import OrderedDict
 
 
 # Import the clinical backend
-from backend import summarize_clinical_note
+from backend import (
+    MAX_NOTE_LENGTH, MIN_NOTE_LENGTH, iso_timestamp, note_length_error,
+    summarize_clinical_note, summarize_clinical_note_stream
+)
+
+
+class OrjsonProvider(JSONProvider):
+    """JSON provider backed by orjson - serializes in C straight to bytes.
+    Keys keep insertion order, matching JSON_SORT_KEYS = False.
+    """
+    
+    def dumps(self, obj, **kwargs):
+        return self._encode(obj).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self._encode(obj), mimetype="application/json")
+    
+    @staticmethod
+    def _encode(obj):
+        # Fall back to Flask's default encoder for types orjson doesn't know
+        return orjson.dumps(obj, default=DefaultJSONProvider.default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class RateLimiter:
+    """Per-client token bucket: `per_minute` requests, refilled continuously
+    Buckets are kept in least-recently-seen order and the oldest are dropped past
+    `max_clients`, so memory stays bounded at O(1) cost per request.
+    """
+    
+    def __init__(self, per_minute: int, max_clients: int = 10000):
+        self.capacity = per_minute
+        self.refill_per_second = per_minute / 60.0
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def allow(self, client: str) -> bool:
+        """Take a token for this client; False when the client is over the limit"""
+        if self.capacity <= 0:
+            return True
+        
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(client, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - last) * self.refill_per_second)
+            allowed = tokens >= 1
+            self._buckets[client] = (tokens - 1 if allowed else tokens, now)
+            self._buckets.move_to_end(client)
+            
+            # The least recently seen client goes first; it has had the longest to refill
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+            return allowed
 
 
 app = Flask(__name__)
 app.config['JSON_SORT_KEYS'] = False
+app.json = OrjsonProvider(app)
+
+# Summaries per minute per client IP (0 disables the limit). Buckets live in this
+# process, so under several Hypercorn workers the limit applies per worker
+rate_limiter = RateLimiter(int(os.getenv("RATE_LIMIT_PER_MINUTE", "60")))
+
+
+# ============================================
+# STATIC RESPONSES
+# ============================================
+# /api/status and /api/config only depend on the environment, so build them once
+GITHUB_TOKEN_CONFIGURED = bool(os.getenv("GITHUB_MODELS_TOKEN", ""))
+
+STATUS_BASE = {
+    "status": "online",
+    "version": "2.0.0",
+    "features": {
+        "abbreviation_expansion": True,
+        "deidentification": True,
+        "section_extraction": True,
+        "ai_summarization": GITHUB_TOKEN_CONFIGURED,
+        "red_flag_detection": True,
+        "hallucination_detection": True,
+        "safety_checks": True,
+        "diagnostic_question_detection": True,
+        "streaming_summaries": True
+    },
+    "github_models_api": "configured" if GITHUB_TOKEN_CONFIGURED else "not configured"
+}
+
+APP_CONFIG = {
+    "app_name": "Clinical Documentation Assistant",
+    "version": "2.0.0",
+    "features": [
+        "Abbreviation Expansion",
+        "PII De-identification",
+        "Clinical Section Extraction",
+        "AI-Powered Summarization (with GitHub Models API)",
+        "Red Flag Detection",
+        "Hallucination Prevention",
+        "Safety Compliance Checks",
+        "RAG-Grounded Responses",
+        "Diagnostic Question Detection",
+        "Streaming Summaries (Server-Sent Events)"
+    ],
+    "max_note_length": MAX_NOTE_LENGTH,
+    "min_note_length": MIN_NOTE_LENGTH
+}
 
 
 # ============================================
@@ -27,46 +134,83 @@ def index():
     return render_template('index.html')
 
 
+def format_summary_response(result):
+    """Format a backend result for the frontend"""
+    if result['success']:
+        return {
+            "success": True,
+            "sections": result['sections'],
+            "ai_summary": result.get('ai_summary', ''),
+            "final_summary": result.get('final_summary', ''),
+            "is_safe": result['is_safe'],
+            "has_red_flags": result['has_red_flags'],
+            "red_flags": result['red_flags'],
+            "confidence": result['confidence'],
+            "sections_found": result['sections_found'],
+            "timestamp": iso_timestamp()
+        }
+    elif result.get('is_diagnostic_question'):
+        # Handle diagnostic questions - pass through to frontend
+        return {
+            "success": False,
+            "is_diagnostic_question": True,
+            "error": result.get('error', 'Diagnostic question detected'),
+            "message": result.get('message', 'Please consult a qualified healthcare professional'),
+            "suggestion": result.get('suggestion', '')
+        }
+    else:
+        return {
+            "success": False,
+            "error": result.get('error', 'Unknown error')
+        }
+
+
+def read_note():
+    """Decode the request body with orjson - the note text, or None for a malformed body"""
+    try:
+        data = orjson.loads(request.get_data(cache=False))
+    except orjson.JSONDecodeError:
+        return None
+    
+    clinical_note = data.get('note', '') if isinstance(data, dict) else None
+    return clinical_note if isinstance(clinical_note, str) else None
+
+
+def reject_request(clinical_note):
+    """Cheap checks before any summarization work - returns an error response or None"""
+    if not rate_limiter.allow(request.remote_addr or "unknown"):
+        return jsonify({
+            "success": False,
+            "error": "Too many requests - please wait a moment and try again"
+        }), 429
+    
+    if clinical_note is None:
+        return jsonify({
+            "success": False,
+            "error": "Request body must be a JSON object with a \"note\" string"
+        }), 400
+    
+    error = note_length_error(clinical_note)
+    if error:
+        return jsonify({"success": False, "error": error}), 400
+    
+    return None
+
+
 @app.route('/api/summarize', methods=['POST'])
 def api_summarize():
     """API endpoint for clinical note summarization"""
     try:
-        data = request.json
-        clinical_note = data.get('note', '')
+        clinical_note = read_note()
+        
+        rejection = reject_request(clinical_note)
+        if rejection:
+            return rejection
         
         # Call the integrated backend
         result = summarize_clinical_note(clinical_note)
         
-        # Format response for frontend
-        if result['success']:
-            response = {
-                "success": True,
-                "sections": result['sections'],
-                "ai_summary": result.get('ai_summary', ''),
-                "final_summary": result.get('final_summary', ''),
-                "is_safe": result['is_safe'],
-                "has_red_flags": result['has_red_flags'],
-                "red_flags": result['red_flags'],
-                "confidence": result['confidence'],
-                "sections_found": result['sections_found'],
-                "timestamp": datetime.now().isoformat()
-            }
-        elif result.get('is_diagnostic_question'):
-            # Handle diagnostic questions - pass through to frontend
-            response = {
-                "success": False,
-                "is_diagnostic_question": True,
-                "error": result.get('error', 'Diagnostic question detected'),
-                "message": result.get('message', 'Please consult a qualified healthcare professional'),
-                "suggestion": result.get('suggestion', '')
-            }
-        else:
-            response = {
-                "success": False,
-                "error": result.get('error', 'Unknown error')
-            }
-        
-        return jsonify(response)
+        return jsonify(format_summary_response(result))
         
     except Exception as e:
         return jsonify({
@@ -75,49 +219,49 @@ def api_summarize():
         }), 500
 
 
+@app.route('/api/summarize/stream', methods=['POST'])
+def api_summarize_stream():
+    """Streaming summarization endpoint (Server-Sent Events)
+    Sends the extracted sections first, then the AI summary as it is generated,
+    then the same payload /api/summarize returns as the final "done" event.
+    """
+    clinical_note = read_note()
+    
+    rejection = reject_request(clinical_note)
+    if rejection:
+        return rejection
+    
+    def generate():
+        try:
+            for event, payload in summarize_clinical_note_stream(clinical_note):
+                if event == "done":
+                    payload = format_summary_response(payload)
+                yield f"event: {event}\ndata: {app.json.dumps(payload)}\n\n"
+        except Exception as e:
+            error = {"success": False, "error": f"Server error: {str(e)}"}
+            yield f"event: done\ndata: {app.json.dumps(error)}\n\n"
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.route('/api/status', methods=['GET'])
 def api_status():
     """API status endpoint"""
-    github_token_configured = bool(os.getenv("GITHUB_MODELS_TOKEN", ""))
-    
-    return jsonify({
-        "status": "online",
-        "version": "2.0.0",
-        "features": {
-            "abbreviation_expansion": True,
-            "deidentification": True,
-            "section_extraction": True,
-            "ai_summarization": github_token_configured,
-            "red_flag_detection": True,
-            "hallucination_detection": True,
-            "safety_checks": True,
-            "diagnostic_question_detection": True
-        },
-        "github_models_api": "configured" if github_token_configured else "not configured",
-        "timestamp": datetime.now().isoformat()
-    })
+    response = jsonify({**STATUS_BASE, "timestamp": iso_timestamp()})
+    response.headers["Cache-Control"] = "max-age=1"
+    return response
 
 
 @app.route('/api/config', methods=['GET'])
 def api_config():
     """Get application configuration"""
-    return jsonify({
-        "app_name": "Clinical Documentation Assistant",
-        "version": "2.0.0",
-        "features": [
-            "Abbreviation Expansion",
-            "PII De-identification",
-            "Clinical Section Extraction",
-            "AI-Powered Summarization (with GitHub Models API)",
-            "Red Flag Detection",
-            "Hallucination Prevention",
-            "Safety Compliance Checks",
-            "RAG-Grounded Responses",
-            "Diagnostic Question Detection"
-        ],
-        "max_note_length": 5000,
-        "min_note_length": 10
-    })
+    response = jsonify(APP_CONFIG)
+    response.headers["Cache-Control"] = "max-age=1"
+    return response
 
 
 if __name__ == '__main__':
@@ -139,4 +283,7 @@ if __name__ == '__main__':
     print("\nPress Ctrl+C to stop the server")
     print("=" * 70)
     
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    # The built-in server is for development only (set DEV=1 for the debugger and reloader).
+    # In production run: hypercorn --config hypercorn.toml wsgi:app:app
+    dev_mode = bool(os.getenv("DEV"))
+    app.run(debug=dev_mode, host='0.0.0.0', port=5000)
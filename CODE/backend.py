@@ -6,11 +6,26 @@ import os
 import re
 import json
 import time
+import heapq
+import hashlib
+import functools
+import threading
 import requests
-from typing import Dict, Tuple, List, Optional
-from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from collections import Counter, OrderedDict, deque
+from typing import Dict, Tuple, List, Optional, Iterator
+from datetime import datetime, timezone
 from dotenv import load_dotenv
 
+# RE2 (pip install google-re2) matches in guaranteed linear time; used for the
+# diagnostic-question check on untrusted input when available
+try:
+    import re2 as _regex_engine
+except ImportError:
+    _regex_engine = re
+
 # Load environment variables
 load_dotenv()
 
@@ -37,6 +52,38 @@ ABBREVIATIONS = {
     "pe": "physical examination", "yo": "year old", "yoa": "year old adult"
 }
 
+def _trie_alternation(words) -> str:
+    """Regex alternation over `words` shaped as a prefix trie, ASCII letters matching either case.
+    re tries alternatives one at a time, so shared prefixes let a position fail after one
+    character instead of once per word; [aA] classes avoid IGNORECASE folding per comparison.
+    Longer words are tried first ("w/o" before "w/").
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word.lower():
+            node = node.setdefault(ch, {})
+        node[""] = {}  # a word ends here
+    
+    def emit(node):
+        branches = [
+            (f"[{ch}{ch.upper()}]" if ch.isascii() and ch.isalpha() else re.escape(ch)) + emit(child)
+            for ch, child in node.items() if ch
+        ]
+        if not branches:
+            return ""
+        if len(branches) == 1 and "" not in node:
+            return branches[0]
+        return "(?:" + "|".join(branches) + ")" + ("?" if "" in node else "")
+    
+    return emit(trie)
+
+# One alternation over every abbreviation so expansion is a single pass over the note.
+# Word-character lookarounds rather than \b, so keys ending in punctuation match
+# before a space ("w/ fever").
+_ABBREVIATION_ALTERNATION = _trie_alternation(ABBREVIATIONS)
+_ABBREVIATION_RE = re.compile(r'(?<!\w)(' + _ABBREVIATION_ALTERNATION + r')(?!\w)')
+
 # ============================================
 # ICD-10 REFERENCE DATABASE
 # ============================================
@@ -70,6 +117,16 @@ ICD10_CODES = {
     "pharyngitis": "J02.9"
 }
 
+# Result entries built once, in table order
+_ICD10_ENTRIES = [
+    (condition, {
+        "condition": condition,
+        "icd10_code": code,
+        "description": f"{condition.title()} - {code}"
+    })
+    for condition, code in ICD10_CODES.items()
+]
+
 # ============================================
 # GITHUB MODELS API CONFIGURATION
 # ============================================
@@ -77,6 +134,69 @@ GITHUB_TOKEN = os.getenv("GITHUB_MODELS_TOKEN", "")
 MODEL_ID = os.getenv("MODEL_ID", "gpt-4o-mini")
 GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://models.inference.ai.azure.com/chat/completions")
 
+# Retries after the first attempt, with short exponential backoff between them
+API_RETRIES = 2
+
+# Shared HTTP session - keeps the TLS connection to the API alive between requests
+# so concurrent request threads don't pay a new handshake on every summary.
+# The adapter does all retrying; POST has to be allowed explicitly.
+HTTP_SESSION = requests.Session()
+HTTP_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=20,
+    pool_maxsize=100,
+    max_retries=Retry(
+        total=API_RETRIES,
+        backoff_factor=1,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=frozenset({"POST"}),
+        # Quota 429s carry Retry-After values of minutes or hours, and urllib3 sleeps
+        # for the full value (outside the request timeout) - fail fast instead
+        respect_retry_after_header=False
+    )
+))
+HTTP_SESSION.headers.update({"Connection": "keep-alive"})
+
+API_HEADERS = {
+    "Authorization": f"Bearer {GITHUB_TOKEN}",
+    "Content-Type": "application/json"
+}
+
+# Error strings returned by call_github_models_api - these must never be cached
+API_ERROR_PREFIXES = (
+    "GitHub Models API token not configured",
+    "Error:",
+    "API Error",
+    "Failed to get response",
+)
+
+# ============================================
+# SUMMARY CACHE CONFIGURATION
+# ============================================
+CACHE_DISABLE = os.getenv("CACHE_DISABLE", "").lower() in ("1", "true", "yes")
+SUMMARY_CACHE_SIZE = int(os.getenv("SUMMARY_CACHE_SIZE", "256"))
+
+# ============================================
+# MICRO-BATCH CONFIGURATION
+# ============================================
+# Concurrent summaries arriving within BATCH_TIMEOUT_MS are sent to the API as one
+# request. Off by default (size 1): batching puts several notes in one prompt.
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "1"))
+BATCH_TIMEOUT_MS = int(os.getenv("BATCH_TIMEOUT_MS", "50"))
+
+# ============================================
+# AUDIT TRAIL CONFIGURATION
+# ============================================
+# Maximum events kept per trail; the oldest are dropped first
+AUDIT_TRAIL_MAXLEN = int(os.getenv("AUDIT_TRAIL_MAXLEN", "10000"))
+
+# ============================================
+# PREPROCESSING POOL CONFIGURATION
+# ============================================
+# Worker processes for the local pipeline (de-identify, expand, sections, ICD-10,
+# red flags). 0 runs it in the request thread, which is fastest for typical notes;
+# raise it on many-core hosts where that CPU work contends for the GIL.
+PREPROCESS_WORKERS = int(os.getenv("PREPROCESS_WORKERS", "0"))
+
 # ============================================
 # RAG KNOWLEDGE BASE
 # ============================================
@@ -119,71 +239,226 @@ RAG_KNOWLEDGE_BASE = [
     }
 ]
 
+# Accepted clinical note length (characters)
+MIN_NOTE_LENGTH = 10
+MAX_NOTE_LENGTH = 5000
+
 DISCLAIMER = "This output is for informational purposes only. Not for diagnosis or treatment advice. Always consult with qualified healthcare professionals."
 
+# ============================================
+# TIMESTAMPS
+# ============================================
+@functools.lru_cache(maxsize=1)
+def _iso_second(second: int) -> str:
+    return datetime.fromtimestamp(second, tz=timezone.utc).isoformat()
+
+def iso_timestamp(timestamp: Optional[float] = None) -> str:
+    """UTC ISO-8601 timestamp at one-second resolution, formatted once per second"""
+    return _iso_second(int(time.time() if timestamp is None else timestamp))
+
 # ============================================
 # AUDIT TRAIL SYSTEM
 # ============================================
 class AuditTrail:
-    def __init__(self):
-        self.events = []
-    
-    def log_event(self, event_type: str, details: Dict, status: str = "success"):
-        """Log an operation event"""
-        event = {
-            "timestamp": datetime.now().isoformat(),
-            "type": event_type,
-            "details": details,
-            "status": status
-        }
-        self.events.append(event)
+    __slots__ = ("events", "_event_types", "_total_count", "_success_count", "_error_count")
+    
+    def __init__(self, maxlen: int = AUDIT_TRAIL_MAXLEN):
+        self.events = deque(maxlen=maxlen)
+        # Running totals so get_summary doesn't rescan every event
+        self._event_types = {}  # ordered set of event types seen
+        self._total_count = 0
+        self._success_count = 0
+        self._error_count = 0
+    
+    def log_event(self, event_type: str, details: Optional[Dict] = None, status: str = "success"):
+        """Log an operation event (stored as a plain tuple; dicts and timestamps are built when the trail is read)"""
+        self.events.append((time.time(), event_type, details, status))
+        self._total_count += 1
+        self._event_types[event_type] = None
+        if status == "success":
+            self._success_count += 1
+        elif status == "error":
+            self._error_count += 1
     
     def get_trail(self):
         """Get complete audit trail"""
-        return self.events
+        return [
+            {
+                "timestamp": iso_timestamp(timestamp),
+                "type": event_type,
+                "details": {} if details is None else details,
+                "status": status
+            }
+            for timestamp, event_type, details, status in self.events
+        ]
     
     def get_summary(self):
         """Get audit trail summary"""
         return {
-            "total_events": len(self.events),
-            "event_types": list(set(e["type"] for e in self.events)),
-            "success_count": sum(1 for e in self.events if e["status"] == "success"),
-            "error_count": sum(1 for e in self.events if e["status"] == "error"),
-            "start_time": self.events[0]["timestamp"] if self.events else None,
-            "end_time": self.events[-1]["timestamp"] if self.events else None
+            "total_events": self._total_count,
+            "event_types": list(self._event_types),
+            "success_count": self._success_count,
+            "error_count": self._error_count,
+            "start_time": iso_timestamp(self.events[0][0]) if self.events else None,
+            "end_time": iso_timestamp(self.events[-1][0]) if self.events else None
         }
 
+# ============================================
+# SUMMARY CACHE
+# ============================================
+class SummaryCache:
+    """In-memory LRU cache of AI summaries for repeat notes"""
+
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(expanded_note: str, sections: Dict) -> Tuple:
+        """Build a cache key from the de-identified, expanded note.
+
+        Case and whitespace are normalized so trivially re-typed notes still hit,
+        and the key is scoped by which sections were found so differently shaped
+        notes never share a summary. The note itself is kept only as a SHA-256
+        digest: a 32-byte key instead of up to 5 KB of note text per entry, without
+        the collision risk of hash() (a collision would return another note's summary).
+        """
+        normalized = " ".join(expanded_note.lower().split())
+        found = tuple(name for name, value in sections.items() if value != "Not available")
+        return (found, hashlib.sha256(normalized.encode("utf-8")).digest())
+
+    def get(self, key: Tuple) -> Optional[Tuple[str, List[Dict]]]:
+        """Return the cached (summary, citations) pair, or None on a miss"""
+        if self.max_size <= 0:
+            return None
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Tuple, value: Tuple[str, List[Dict]]):
+        """Store a (summary, citations) pair, evicting the oldest entry when full"""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+summary_cache = SummaryCache(0 if CACHE_DISABLE else SUMMARY_CACHE_SIZE)
+
+# ============================================
+# MICRO-BATCHER
+# ============================================
+class _Batch:
+    def __init__(self):
+        self.items = []
+        self.results = None
+        self.error = None
+        self.full = threading.Event()
+        self.done = threading.Event()
+
+
+class MicroBatcher:
+    """Coalesce concurrent submissions into batches for a single handler call"""
+
+    def __init__(self, handler, max_size: int = 8, timeout: float = 0.05):
+        self.handler = handler
+        self.max_size = max_size
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._batch = None
+
+    def submit(self, item):
+        """Add an item to the open batch and block until its result is ready.
+
+        The first thread into a batch waits up to `timeout` for others to join,
+        then runs the handler on the whole batch; the others wait for their slice.
+        """
+        with self._lock:
+            batch = self._batch
+            is_leader = batch is None
+            if is_leader:
+                batch = self._batch = _Batch()
+            index = len(batch.items)
+            batch.items.append(item)
+            if len(batch.items) >= self.max_size:
+                self._batch = None
+                batch.full.set()
+        
+        if is_leader:
+            batch.full.wait(self.timeout)
+            with self._lock:
+                if self._batch is batch:
+                    self._batch = None
+            try:
+                batch.results = self.handler(batch.items)
+            except Exception as e:
+                batch.error = e
+            finally:
+                batch.done.set()
+        else:
+            batch.done.wait()
+        
+        if batch.error is not None:
+            raise batch.error
+        return batch.results[index]
+
 # ============================================
 # SIMPLE RAG SYSTEM
 # ============================================
 class SimpleRAGSystem:
-    def __init__(self):
+    def __init__(self, cache_size: int = 256):
         self.documents = RAG_KNOWLEDGE_BASE
+        # Lowercase the corpus once here rather than on every query
+        self._index = [(doc, doc["content"].lower(), doc["keywords"]) for doc in self.documents]
+        # LRU of recent retrievals - resubmitted notes skip the scoring loop
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
     
     def retrieve_relevant_docs(self, query: str, top_k: int = 3) -> List[Dict]:
-        """Retrieve relevant documents using keyword matching"""
+        """Retrieve relevant documents using keyword matching (cached per query)"""
+        if self.cache_size <= 0:
+            return self._score(query, top_k)
+        
+        # Keyed by digest like SummaryCache, so the cache holds no note text
+        key = (hashlib.sha256(query.encode("utf-8")).digest(), top_k)
+        with self._lock:
+            results = self._cache.get(key)
+            if results is not None:
+                self._cache.move_to_end(key)
+                return list(results)
+        
+        results = self._score(query, top_k)
+        
+        with self._lock:
+            self._cache[key] = results
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return list(results)
+    
+    def _score(self, query: str, top_k: int) -> List[Dict]:
         query_lower = query.lower()
         query_words = set(query_lower.split())
         
         scored_docs = []
-        for doc in self.documents:
-            score = 0
-            doc_content_lower = doc["content"].lower()
-            for word in query_words:
-                if word in doc_content_lower:
-                    score += 2
-            
-            for keyword in doc["keywords"]:
-                if keyword in query_lower:
-                    score += 3
+        for doc, doc_content_lower, keywords in self._index:
+            score = 2 * sum(1 for word in query_words if word in doc_content_lower)
+            score += 3 * sum(1 for keyword in keywords if keyword in query_lower)
             
             if score > 0:
                 scored_docs.append((doc, score))
         
-        scored_docs.sort(key=lambda x: x[1], reverse=True)
+        # Same ordering as a stable sort by score, without sorting every match
+        top_docs = heapq.nlargest(top_k, scored_docs, key=lambda x: x[1])
         
         results = []
-        for doc, score in scored_docs[:top_k]:
+        for doc, score in top_docs:
             results.append({
                 "document": doc,
                 "score": min(score / 10.0, 1.0),
@@ -191,15 +466,26 @@ class SimpleRAGSystem:
             })
         return results
 
+# One instance shared by all requests, so its retrieval cache is too (off with CACHE_DISABLE)
+rag_system = SimpleRAGSystem(0 if CACHE_DISABLE else 256)
+
 # ============================================
 # METRICS CALCULATION
 # ============================================
+def _tokenize(text: str) -> List[str]:
+    """Lowercased word tokens"""
+    return text.lower().split()
+
 class MetricsCalculator:
     @staticmethod
     def calculate_rouge_score(reference: str, candidate: str) -> float:
         """Calculate simplified ROUGE-L score"""
-        ref_words = set(reference.lower().split())
-        cand_words = set(candidate.lower().split())
+        return MetricsCalculator._rouge(_tokenize(reference), _tokenize(candidate))
+    
+    @staticmethod
+    def _rouge(ref_tokens: List[str], cand_tokens: List[str]) -> float:
+        ref_words = set(ref_tokens)
+        cand_words = set(cand_tokens)
         
         if len(ref_words) == 0 or len(cand_words) == 0:
             return 0.0
@@ -216,15 +502,26 @@ class MetricsCalculator:
     
     @staticmethod
     def calculate_bleu_score(reference: str, candidate: str) -> float:
-        """Calculate simplified BLEU score (1-gram)"""
-        ref_words = reference.lower().split()
-        cand_words = candidate.lower().split()
-        
-        if len(cand_words) == 0:
+        """Calculate simplified BLEU score (1-gram, clipped counts)"""
+        return MetricsCalculator._bleu(_tokenize(reference), _tokenize(candidate))
+    
+    @staticmethod
+    def _bleu(ref_tokens: List[str], cand_tokens: List[str]) -> float:
+        if len(cand_tokens) == 0:
             return 0.0
         
-        matches = sum(1 for word in cand_words if word in ref_words)
-        return round(matches / len(cand_words), 3)
+        # Each candidate word only counts as often as it appears in the reference
+        matches = sum((Counter(ref_tokens) & Counter(cand_tokens)).values())
+        return round(matches / len(cand_tokens), 3)
+    
+    @staticmethod
+    def score_pair(reference: str, candidate: str) -> Dict[str, float]:
+        """Calculate ROUGE and BLEU for one reference/candidate pair, tokenizing each once"""
+        ref_tokens, cand_tokens = _tokenize(reference), _tokenize(candidate)
+        return {
+            "rouge_score": MetricsCalculator._rouge(ref_tokens, cand_tokens),
+            "bleu_score": MetricsCalculator._bleu(ref_tokens, cand_tokens)
+        }
     
     @staticmethod
     def calculate_confidence_explanation(sections_found: int, 
@@ -284,259 +581,363 @@ class MetricsCalculator:
             "explanation": f"Confidence is {round(confidence_score * 100)}% based on section completeness ({sections_found}/7), safety checks, and knowledge base grounding."
         }
 
+# Holds no state, so every request can share it
+metrics_calculator = MetricsCalculator()
+
 # ============================================
 # UTILITY FUNCTIONS
 # ============================================
 
+# Diagnosis-type nouns, singular and plural
+_DIAGNOSIS_NOUNS = [
+    ("disease", "diseases"),
+    ("condition", "conditions"),
+    ("illness", "illnesses"),
+    ("disorder", "disorders"),
+    ("syndrome", "syndromes"),
+    ("ailment", "ailments")
+]
+
+# Phrasings that ask for a diagnosis or advice instead of supplying a clinical note.
+# Patterns that only match text another pattern already catches are left out:
+# "what is my disease" is covered by "my disease", "what disease do i have" by "do i have".
+DIAGNOSTIC_PATTERNS = [
+    # Diagnosis-related questions
+    r"what\s+(?:is\s+(?:the\s+)?|are\s+the\s+)?diagnos[ie]",
+    r"my\s+diagnos[ie]",
+    r"\bdiagnos[ie]s?\b.*\?",
+    r"diagnose\s+me",
+] + [
+    # Disease, condition, illness, ... questions
+    pattern
+    for singular, plural in _DIAGNOSIS_NOUNS
+    for pattern in (
+        rf"what\s+is\s+(?:the\s+)?{singular}",
+        rf"what\s+are\s+(?:the\s+)?{plural}",
+        rf"my\s+{singular}",
+        rf"\b(?:{singular}|{plural})\b.*\?",
+    )
+] + [
+    # General medical questions
+    r"do\s+i\s+have",
+    r"what\s+is\s+wrong\s+with\s+me",
+    r"should\s+i\s+(?:take|see|go|visit)",
+    r"what\s+treatment\s+do\s+i\s+need",
+    r"what\s+should\s+i\s+do",
+    r"am\s+i\s+sick",
+    r"is\s+this\s+(?:serious|dangerous)",
+    r"will\s+i\s+be\s+okay",
+    r"how\s+long\s+will\s+i\s+live",
+    r"is\s+it\s+(?:cancer|covid)",
+    r"what\s+(?:doctor|specialist|medicine|drug|cure)",
+    r"how\s+to\s+(?:treat|cure|fix)",
+]
+
+# All of the above as one alternation, compiled once. The flag is inline because
+# re2's compile() takes options, not re flags. Under RE2, \b and \s are ASCII-only.
+_DIAGNOSTIC_SOURCE = "|".join(f"(?:{p})" for p in DIAGNOSTIC_PATTERNS)
+_DIAGNOSTIC_RE = _regex_engine.compile("(?i)" + _DIAGNOSTIC_SOURCE)
+
+# Same patterns for ASCII-only text, where re's ASCII case folding is much cheaper
+# than the Unicode one. Unicode \s also matches \x1c-\x1f, so the ASCII copy keeps that
+if _regex_engine is re:
+    _DIAGNOSTIC_ASCII_RE = re.compile("(?ai)" + _DIAGNOSTIC_SOURCE.replace(r"\s", r"[\s\x1c-\x1f]"))
+else:
+    _DIAGNOSTIC_ASCII_RE = _DIAGNOSTIC_RE
+
+# Every pattern above requires at least one of these words, so text containing none
+# of them can't match - a few substring searches are much cheaper than the regex
+_DIAGNOSTIC_KEYWORDS = (
+    "diagnos", "disease", "condition", "illness", "disorder", "syndrome", "ailment",
+    "have", "wrong", "should", "treat", "sick", "serious", "dangerous", "okay", "live",
+    "cancer", "covid", "doctor", "specialist", "medicine", "drug", "cure", "fix"
+)
+
 def check_for_diagnostic_question(text: str) -> bool:
     """Check if user is asking for diagnosis instead of providing clinical notes"""
-    diagnostic_patterns = [
-        # Diagnosis-related questions
-        r"what\s+is\s+(?:the\s+)?diagnos[ie]s?",
-        r"what\s+are\s+the\s+diagnos[ie]s?",
-        r"what\s+diagnos[ie]s?",
-        r"\bdiagnos[ie]s?\b.*\?",
-        r"my\s+diagnos[ie]s?",
-        r"what\s+is\s+my\s+diagnos[ie]s?",
-        
-        # Disease-related questions (NEW)
-        r"what\s+is\s+(?:the\s+)?disease",
-        r"what\s+are\s+(?:the\s+)?diseases",
-        r"what\s+disease\s+do\s+i\s+have",
-        r"what\s+diseases\s+do\s+i\s+have",
-        r"my\s+disease",
-        r"my\s+diseases",
-        r"what\s+is\s+my\s+disease",
-        r"what\s+is\s+my\s+diseases",
-        r"\bdisease\b.*\?",
-        r"\bdiseases\b.*\?",
-        
-        # Condition-related questions
-        r"what\s+is\s+(?:the\s+)?condition",
-        r"what\s+are\s+(?:the\s+)?conditions",
-        r"what\s+condition\s+do\s+i\s+have",
-        r"what\s+conditions\s+do\s+i\s+have",
-        r"my\s+condition",
-        r"my\s+conditions",
-        r"what\s+is\s+my\s+condition",
-        r"what\s+is\s+my\s+conditions",
-        r"\bcondition\b.*\?",
-        r"\bconditions\b.*\?",
-        
-        # Illness-related questions
-        r"what\s+is\s+(?:the\s+)?illness",
-        r"what\s+are\s+(?:the\s+)?illnesses",
-        r"what\s+illness\s+do\s+i\s+have",
-        r"what\s+illnesses\s+do\s+i\s+have",
-        r"my\s+illness",
-        r"my\s+illnesses",
-        r"what\s+is\s+my\s+illness",
-        r"what\s+is\s+my\s+illnesses",
-        r"\billness\b.*\?",
-        r"\billnesses\b.*\?",
-        
-        # Disorder-related questions
-        r"what\s+is\s+(?:the\s+)?disorder",
-        r"what\s+are\s+(?:the\s+)?disorders",
-        r"my\s+disorder",
-        r"my\s+disorders",
-        r"what\s+is\s+my\s+disorder",
-        r"what\s+is\s+my\s+disorders",
-        r"\bdisorder\b.*\?",
-        r"\bdisorders\b.*\?",
-        
-        # Syndrome-related questions
-        r"what\s+is\s+(?:the\s+)?syndrome",
-        r"what\s+are\s+(?:the\s+)?syndromes",
-        r"my\s+syndrome",
-        r"my\s+syndromes",
-        r"what\s+is\s+my\s+syndrome",
-        r"what\s+is\s+my\s+syndromes",
-        r"\bsyndrome\b.*\?",
-        r"\bsyndromes\b.*\?",
-        
-        # Ailment-related questions
-        r"what\s+is\s+(?:the\s+)?ailment",
-        r"what\s+are\s+(?:the\s+)?ailments",
-        r"my\s+ailment",
-        r"my\s+ailments",
-        r"what\s+is\s+my\s+ailment",
-        r"what\s+is\s+my\s+ailments",
-        r"\bailment\b.*\?",
-        r"\bailments\b.*\?",
-        
-        # General medical questions
-        r"what\s+do\s+i\s+have",
-        r"diagnose\s+me",
-        r"what\s+is\s+wrong\s+with\s+me",
-        r"what\s+should\s+i\s+take",
-        r"what\s+medication\s+should\s+i\s+take",
-        r"should\s+i\s+take",
-        r"what\s+treatment\s+do\s+i\s+need",
-        r"what\s+should\s+i\s+do",
-        r"am\s+i\s+sick",
-        r"do\s+i\s+have",
-        r"is\s+this\s+serious",
-        r"is\s+this\s+dangerous",
-        r"will\s+i\s+be\s+okay",
-        r"how\s+long\s+will\s+i\s+live",
-        r"is\s+it\s+cancer",
-        r"is\s+it\s+covid",
-        r"should\s+i\s+see",
-        r"should\s+i\s+go",
-        r"should\s+i\s+visit",
-        r"what\s+doctor",
-        r"what\s+specialist",
-        r"what\s+medicine",
-        r"what\s+drug",
-        r"what\s+cure",
-        r"how\s+to\s+treat",
-        r"how\s+to\s+cure",
-        r"how\s+to\s+fix"
-    ]
-    
-    text_lower = text.lower()
-    for pattern in diagnostic_patterns:
-        if re.search(pattern, text_lower):
-            return True
-    return False
+    # The prefilter is exact only for ASCII text: IGNORECASE also matches "ſ" to "s" etc.
+    if text.isascii():
+        text_lower = text.lower()
+        if not any(keyword in text_lower for keyword in _DIAGNOSTIC_KEYWORDS):
+            return False
+        return _DIAGNOSTIC_ASCII_RE.search(text) is not None
+    return _DIAGNOSTIC_RE.search(text) is not None
 
 def expand_abbreviations(note: str) -> str:
     """Expand medical abbreviations in clinical notes"""
     if not isinstance(note, str):
         return ""
     
-    expanded = note
-    for abbr, full in ABBREVIATIONS.items():
-        pattern = rf'\b{re.escape(abbr)}\b'
-        expanded = re.sub(pattern, full, expanded, flags=re.IGNORECASE)
-    return expanded
+    return _ABBREVIATION_RE.sub(lambda m: ABBREVIATIONS[m.group(1).lower()], note)
+
+# PII patterns, compiled once at import
+_EMAIL_RE = re.compile(r'\b[\w\.-]+@[\w\.-]+\.\w+\b')
+_PHONE_RE = re.compile(r'\b(?:\+?\d{1,3}[-.\s]?)?(?:\(?\d{2,3}\)?[-.\s]?)?\d{3}[-.\s]?\d{4}\b')
+_MRN_RE = re.compile(r'\b(?:MRN|ID|PatientID|PID)[:\s-]*[A-Za-z0-9]+\b', re.IGNORECASE)
+# TODO: any two capitalised words count as a name, so headings and phrases like
+# "Chest Pain" or "Identify Patient" are redacted too - needs a real name model/list.
+_NAME_RE = re.compile(r'\b[A-Z][a-z]+ [A-Z][a-z]+\b')
 
 def deidentify_text(text: str) -> str:
     """Remove PII from text"""
     if not isinstance(text, str):
         return ""
     
-    text = re.sub(r'\b[\w\.-]+@[\w\.-]+\.\w+\b', '[REDACTED_EMAIL]', text)
-    text = re.sub(r'\b(\+?\d{1,3}[-.\s]?)?(\(?\d{2,3}\)?[-.\s]?)?\d{3}[-.\s]?\d{4}\b', 
-                  '[REDACTED_PHONE]', text)
-    text = re.sub(r'\b(MRN|ID|PatientID|PID)[:\s-]*[A-Za-z0-9]+\b', 
-                  '[REDACTED_ID]', text, flags=re.IGNORECASE)
-    text = re.sub(r'\b[A-Z][a-z]+ [A-Z][a-z]+\b', '[PATIENT]', text)
+    text = _EMAIL_RE.sub('[REDACTED_EMAIL]', text)
+    text = _PHONE_RE.sub('[REDACTED_PHONE]', text)
+    text = _MRN_RE.sub('[REDACTED_ID]', text)
+    text = _NAME_RE.sub('[PATIENT]', text)
     
     return text
 
+# De-identification and abbreviation expansion fused into one alternation.
+# deidentify_text substitutes email, phone, MRN, name in turn; the lookaheads keep that
+# precedence inside a single left-to-right scan: a match that runs into a
+# higher-priority one (e.g. a name whose second word starts an MRN) is skipped.
+_EMAIL_AHEAD = r'(?![\w\.-]*@[\w\.-]+\.\w+\b)'
+_PHONE_PII = _PHONE_RE.pattern + _EMAIL_AHEAD
+_MRN_PII = (r'(?i:\b(?:MRN|ID|PatientID|PID)[:\s-]*(?!' + _PHONE_PII + r')[A-Za-z0-9]+\b)'
+            + _EMAIL_AHEAD)
+_NAME_PII = r'\b[A-Z][a-z]+ (?!' + _MRN_PII + r')[A-Z][a-z]+\b' + _EMAIL_AHEAD
+_PREPROCESS_RE = re.compile(
+    r'(?P<email>' + _EMAIL_RE.pattern + r')'
+    r'|(?P<phone>' + _PHONE_PII + r')'
+    r'|(?P<mrn>' + _MRN_PII + r')'
+    r'|(?P<name>' + _NAME_PII + r')'
+    # "w/" also expands right before a redacted word ("w/John Smith" -> "with[PATIENT]")
+    r'|(?P<abbr>(?<!\w)(?:' + _ABBREVIATION_ALTERNATION + r')'
+    r'(?:(?<=\w)(?!\w)' + _EMAIL_AHEAD + r'|(?<!\w)(?:(?!\w)|(?='
+    + '|'.join([_EMAIL_RE.pattern, _PHONE_PII, _MRN_PII, _NAME_PII]) + r'))))'
+)
+_PII_PLACEHOLDERS = {
+    "email": "[REDACTED_EMAIL]",
+    "phone": "[REDACTED_PHONE]",
+    "mrn": "[REDACTED_ID]",
+    "name": "[PATIENT]"
+}
+
+def deidentify_and_expand(text: str) -> Tuple[str, str]:
+    """
+    De-identify and expand abbreviations in a single scan
+    Returns (deidentified, expanded) - the same as deidentify_text and then expand_abbreviations.
+    """
+    if not isinstance(text, str):
+        return "", ""
+    
+    deidentified = []
+    expanded = []
+    last = 0
+    for match in _PREPROCESS_RE.finditer(text):
+        start = match.start()
+        if start > last:
+            unchanged = text[last:start]
+            deidentified.append(unchanged)
+            expanded.append(unchanged)
+        
+        kind = match.lastgroup
+        if kind == "abbr":
+            deidentified.append(match.group())
+            expanded.append(ABBREVIATIONS[match.group().lower()])
+        else:
+            placeholder = _PII_PLACEHOLDERS[kind]
+            deidentified.append(placeholder)
+            expanded.append(placeholder)
+        last = match.end()
+    
+    if last < len(text):
+        deidentified.append(text[last:])
+        expanded.append(text[last:])
+    
+    return "".join(deidentified), "".join(expanded)
+
+# Diagnostic language the AI summary must not contain
+HALLUCINATION_PHRASES = [
+    "diagnosed with",
+    "suffering from",
+    "patient has",
+    "treatment is",
+    "recommend",
+    "suggests",
+    "prescribe",
+    "medication should"
+]
+
+# Symptoms that need escalation
+RED_FLAGS = [
+    "chest pain",
+    "shortness of breath",
+    "stroke",
+    "severe bleeding",
+    "loss of consciousness",
+    "difficulty breathing"
+]
+
 def check_for_hallucinations(text: str) -> bool:
     """Check if text contains diagnostic language (hallucinations)"""
-    forbidden_patterns = [
-        "diagnosed with",
-        "suffering from",
-        "patient has",
-        "treatment is",
-        "recommend",
-        "suggests",
-        "prescribe",
-        "medication should"
-    ]
-    
     text_lower = text.lower()
-    for pattern in forbidden_patterns:
-        if pattern in text_lower:
-            return True
-    return False
+    return any(phrase in text_lower for phrase in HALLUCINATION_PHRASES)
+
+class HallucinationScanner:
+    """check_for_hallucinations for text that arrives in pieces (streamed summaries).
+    Keeps the last few characters of each piece so phrases split across pieces still match.
+    """
+    __slots__ = ("found", "_tail")
+    
+    _OVERLAP = max(map(len, HALLUCINATION_PHRASES)) - 1
+    
+    def __init__(self):
+        self.found = False
+        self._tail = ""
+    
+    def feed(self, text: str) -> bool:
+        """Scan the next piece of text; returns True once any phrase has been seen"""
+        if not self.found:
+            window = self._tail + text.lower()
+            self.found = any(phrase in window for phrase in HALLUCINATION_PHRASES)
+            self._tail = window[-self._OVERLAP:]
+        return self.found
 
 def check_for_red_flags(text: str) -> List[str]:
     """Check for red flag symptoms that need escalation"""
-    red_flags = [
-        "chest pain",
-        "shortness of breath",
-        "stroke",
-        "severe bleeding",
-        "loss of consciousness",
-        "difficulty breathing"
-    ]
-    
     text_lower = text.lower()
-    found_flags = [flag for flag in red_flags if flag in text_lower]
-    return found_flags
+    return [flag for flag in RED_FLAGS if flag in text_lower]
 
 def extract_icd10_codes(note: str) -> List[Dict]:
     """Extract relevant ICD-10 codes from clinical note"""
     note_lower = note.lower()
-    found_codes = []
-    
-    for condition, code in ICD10_CODES.items():
-        if condition in note_lower:
-            found_codes.append({
-                "condition": condition,
-                "icd10_code": code,
-                "description": f"{condition.title()} - {code}"
-            })
     
-    return found_codes
+    # Copies, so callers can't modify the shared entries
+    return [dict(entry) for condition, entry in _ICD10_ENTRIES if condition in note_lower]
+
+API_SYSTEM_PROMPT = "You are a clinical documentation specialist. Provide summaries only, no diagnosis."
 
-def call_github_models_api(prompt: str, max_tokens: int = 500, retries: int = 3) -> str:
-    """Call GitHub Models API with retry logic"""
+# The request body is fixed apart from the prompt and max_tokens, so everything
+# around them is serialized once: {"messages": [system, user], "model", "temperature", "max_tokens"}
+_PAYLOAD_PREFIX = (
+    '{"messages":[{"role":"system","content":' + json.dumps(API_SYSTEM_PROMPT) + '},'
+    '{"role":"user","content":'
+).encode()
+_PAYLOAD_MIDDLE = ('}],"model":' + json.dumps(MODEL_ID) + ',"temperature":0.3,"max_tokens":').encode()
+
+def _api_payload(prompt: str, max_tokens: int, stream: bool = False) -> bytes:
+    """JSON request body - only the prompt is serialized per call"""
+    return b"".join((
+        _PAYLOAD_PREFIX,
+        json.dumps(prompt).encode(),
+        _PAYLOAD_MIDDLE,
+        str(int(max_tokens)).encode(),
+        b',"stream":true}' if stream else b'}'
+    ))
+
+def call_github_models_api(prompt: str, max_tokens: int = 500) -> str:
+    """Call GitHub Models API (HTTP_SESSION retries failed attempts)"""
     
     if not GITHUB_TOKEN:
         return "GitHub Models API token not configured."
     
-    headers = {
-        "Authorization": f"Bearer {GITHUB_TOKEN}",
-        "Content-Type": "application/json"
-    }
+    try:
+        response = HTTP_SESSION.post(GITHUB_API_URL, data=_api_payload(prompt, max_tokens),
+                                     headers=API_HEADERS, timeout=30)
+        response.raise_for_status()
+        
+        result = response.json()
+        if "choices" in result and len(result["choices"]) > 0:
+            return result["choices"][0]["message"]["content"]
+        else:
+            return "Error: Unexpected API response format"
     
-    payload = {
-        "messages": [
-            {"role": "system", "content": "You are a clinical documentation specialist. Provide summaries only, no diagnosis."},
-            {"role": "user", "content": prompt}
-        ],
-        "model": MODEL_ID,
-        "temperature": 0.3,
-        "max_tokens": max_tokens
-    }
+    except requests.exceptions.RequestException as e:
+        return f"API Error after {API_RETRIES} retries: {str(e)}"
+
+def stream_github_models_api(prompt: str, max_tokens: int = 500) -> Iterator[str]:
+    """Call GitHub Models API with streaming, yielding summary text as it arrives
+    Raises requests.exceptions.RequestException if the request fails or the stream
+    ends before "[DONE]", so callers can tell a cut-off summary from a complete one.
+    """
     
-    for attempt in range(retries):
-        try:
-            response = requests.post(GITHUB_API_URL, json=payload, headers=headers, timeout=30)
-            response.raise_for_status()
-            
-            result = response.json()
-            if "choices" in result and len(result["choices"]) > 0:
-                return result["choices"][0]["message"]["content"]
-            else:
-                return "Error: Unexpected API response format"
-                
-        except requests.exceptions.RequestException as e:
-            if attempt < retries - 1:
-                time.sleep(2 ** attempt)
+    if not GITHUB_TOKEN:
+        yield "GitHub Models API token not configured."
+        return
+    
+    with HTTP_SESSION.post(GITHUB_API_URL, data=_api_payload(prompt, max_tokens, stream=True),
+                           headers=API_HEADERS, timeout=30, stream=True) as response:
+        response.raise_for_status()
+        
+        # Server-sent events: one "data: {json}" line per chunk, ending with "data: [DONE]".
+        # SSE is always UTF-8 - read raw bytes, since requests would decode a charset-less
+        # text/event-stream as ISO-8859-1; json.loads decodes the UTF-8 itself
+        for line in response.iter_lines():
+            if not line.startswith(b"data:"):
                 continue
-            else:
-                return f"API Error after {retries} retries: {str(e)}"
+            data = line[len(b"data:"):].strip()
+            if data == b"[DONE]":
+                return
+            
+            chunk = json.loads(data)
+            if chunk.get("choices"):
+                delta = chunk["choices"][0].get("delta", {}).get("content")
+                if delta:
+                    yield delta
+    
+    raise requests.exceptions.RequestException("Stream ended before [DONE]")
+
+def summarize_prompts_batch(prompts: List[str], max_tokens: int = 500) -> List[str]:
+    """Summarize several prompts with one API call, falling back to one call each"""
+    if len(prompts) == 1:
+        return [call_github_models_api(prompts[0], max_tokens)]
     
-    return "Failed to get response from GitHub Models API"
+    batch_prompt = (
+        "Summarize each clinical note below independently, following the instructions "
+        "inside each one. Never mix information between notes. Respond with ONLY a JSON "
+        "array of strings, one summary per note, in the same order.\n\n"
+        + json.dumps(prompts)
+    )
+    response = call_github_models_api(batch_prompt, max_tokens * len(prompts))
+    if response.startswith(API_ERROR_PREFIXES):
+        return [response] * len(prompts)
+    
+    # Models sometimes wrap JSON in a ```json fence
+    response = response.strip()
+    if response.startswith("```"):
+        response = response.strip("`")
+        if response.startswith("json"):
+            response = response[4:]
+    try:
+        summaries = json.loads(response)
+    except ValueError:
+        summaries = None
+    
+    if (isinstance(summaries, list) and len(summaries) == len(prompts)
+            and all(isinstance(summary, str) for summary in summaries)):
+        return summaries
+    return [call_github_models_api(prompt, max_tokens) for prompt in prompts]
+
+
+summary_batcher = MicroBatcher(summarize_prompts_batch, BATCH_MAX_SIZE, BATCH_TIMEOUT_MS / 1000.0)
+
+# "adult" with or without a generic age word in front
+_AGE_DESC_RE = re.compile(r'\b(?:(?:young|middle-aged|elderly|old)\s+)?adult\b', re.IGNORECASE)
 
 def clean_generic_descriptors(text: str) -> str:
     """Remove generic age descriptors like young adult, middle-aged adult, etc."""
-    text = re.sub(r'\b(young|middle-aged|elderly|old)\s+adult\b', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'\badult\b', '', text, flags=re.IGNORECASE)
-    return text.strip()
+    return _WS_RE.sub(' ', _AGE_DESC_RE.sub('', text)).strip()
 
-def hybrid_summarize_with_rag(expanded_note: str, rag_system, sections: Dict = None) -> tuple:
-    """Hybrid summarization using role-based prompting and RAG"""
+def build_rag_prompt(expanded_note: str, rag_system, sections: Dict = None) -> Tuple[str, List[Dict]]:
+    """Build the role-based, RAG-grounded summarization prompt and its citations"""
     
     relevant_docs = rag_system.retrieve_relevant_docs(expanded_note, top_k=3)
     
-    context = "Relevant Policies:\n"
-    citations = []
-    for doc_result in relevant_docs:
-        doc = doc_result["document"]
-        context += f"- {doc['title']}: {doc['content']}\n"
-        citations.append({
-            "source": doc["id"],
-            "title": doc["title"],
-            "relevance_score": doc_result["score"]
-        })
+    context = "Relevant Policies:\n" + "".join(
+        f"- {r['document']['title']}: {r['document']['content']}\n" for r in relevant_docs
+    )
+    citations = [
+        {
+            "source": r["document"]["id"],
+            "title": r["document"]["title"],
+            "relevance_score": r["score"]
+        }
+        for r in relevant_docs
+    ]
     
     # Build demographics string for the prompt
     demographics_str = ""
@@ -570,9 +971,59 @@ Provide a structured summary with the following format:
 
 Professional Summary:"""
     
-    summary = call_github_models_api(prompt)
+    return prompt, citations
+
+def hybrid_summarize_with_rag(expanded_note: str, rag_system, sections: Dict = None) -> tuple:
+    """Hybrid summarization using role-based prompting and RAG"""
+    
+    prompt, citations = build_rag_prompt(expanded_note, rag_system, sections)
+    summary = summary_batcher.submit(prompt)
     return summary, citations
 
+# Section markers with their section types
+SECTION_MARKERS = [
+    (r'pt\s+profile', "demographics"),
+    (r'demographics', "demographics"),
+    (r'hpi', "chief_complaint"),
+    (r'history\s+of\s+present\s+illness', "chief_complaint"),
+    (r'chief\s+complaint', "chief_complaint"),
+    (r'cc\b', "chief_complaint"),
+    (r'presenting\s+complaint', "chief_complaint"),
+    (r'pmh', "medical_history"),
+    (r'past\s+medical\s+history', "medical_history"),
+    (r'psh', "medical_history"),
+    (r'past\s+surgical\s+history', "medical_history"),
+    (r'fhx', "medical_history"),
+    (r'family\s+history', "medical_history"),
+    (r'medications', "medications"),
+    (r'meds\b', "medications"),
+    (r'allergies', "allergies"),
+    (r'allergy\b', "allergies"),
+    (r'nkda', "allergies"),
+    (r'vital\s+signs', "vital_signs"),
+    (r'vs\b', "vital_signs"),
+    (r'vitals', "vital_signs"),
+    (r'pe\b', "observations"),
+    (r'physical\s+exam', "observations"),
+    (r'physical\s+examination', "observations"),
+    (r'observations', "observations"),
+    (r'findings', "observations"),
+    (r'notes\b', "observations"),
+]
+
+# Compiled once. Each marker keeps its own scan: a single alternation of all of them
+# is several times slower (no literal prefix to search for) and drops overlapping markers
+_SECTION_MARKER_RES = [(re.compile(pattern), section_type) for pattern, section_type in SECTION_MARKERS]
+
+# Helper patterns for section cleanup and the demographics/allergies special cases
+_LEAD_PUNCT_RE = re.compile(r'^[\s:;,.-]+')
+_TRAIL_PUNCT_RE = re.compile(r'[\s:;,.-]+$')
+_WS_RE = re.compile(r'\s+')
+_PT_PROFILE_RE = re.compile(r'(?:\[PATIENT\]|pt|patient)\s*(?:profile)?\s*:?\s*([^.]+)', re.IGNORECASE)
+_AGE_RE = re.compile(r'(\d+)\s*(?:year|yo|y\.o\.)')
+_AGE_DESCRIPTOR_RE = re.compile(r'(\w+\s+)?\d+\s*(?:year|yo)', re.IGNORECASE)
+_NO_ALLERGIES_RE = re.compile(r'no\s+(?:known\s+)?allergies|nkda')
+
 def extract_sections(note: str) -> Dict[str, str]:
     """
     Extract clinical sections using improved approach
@@ -589,61 +1040,23 @@ def extract_sections(note: str) -> Dict[str, str]:
         "observations": "Not available"
     }
     
-    # Define section markers with their section types
-    markers = [
-        (r'pt\s+profile', "demographics"),
-        (r'demographics', "demographics"),
-        (r'hpi', "chief_complaint"),
-        (r'history\s+of\s+present\s+illness', "chief_complaint"),
-        (r'chief\s+complaint', "chief_complaint"),
-        (r'cc\b', "chief_complaint"),
-        (r'presenting\s+complaint', "chief_complaint"),
-        (r'pmh', "medical_history"),
-        (r'past\s+medical\s+history', "medical_history"),
-        (r'psh', "medical_history"),
-        (r'past\s+surgical\s+history', "medical_history"),
-        (r'fhx', "medical_history"),
-        (r'family\s+history', "medical_history"),
-        (r'medications', "medications"),
-        (r'meds\b', "medications"),
-        (r'allergies', "allergies"),
-        (r'allergy\b', "allergies"),
-        (r'nkda', "allergies"),
-        (r'vital\s+signs', "vital_signs"),
-        (r'vs\b', "vital_signs"),
-        (r'vitals', "vital_signs"),
-        (r'pe\b', "observations"),
-        (r'physical\s+exam', "observations"),
-        (r'physical\s+examination', "observations"),
-        (r'observations', "observations"),
-        (r'findings', "observations"),
-        (r'notes\b', "observations"),
-    ]
-    
     text_lower = note.lower()
     
     # Find all marker positions
-    marker_positions = []
-    for pattern, section_type in markers:
-        for match in re.finditer(pattern, text_lower):
-            marker_positions.append({
-                'start': match.start(),
-                'end': match.end(),
-                'section': section_type,
-                'marker': match.group(0)
-            })
+    marker_positions = [
+        (match.start(), match.end(), section_type)
+        for marker_re, section_type in _SECTION_MARKER_RES
+        for match in marker_re.finditer(text_lower)
+    ]
     
     # Sort by position
-    marker_positions.sort(key=lambda x: x['start'])
+    marker_positions.sort(key=lambda x: x[0])
     
     # Extract content for each marker
-    for i, marker_info in enumerate(marker_positions):
-        section_type = marker_info['section']
-        content_start = marker_info['end']
-        
+    for i, (_, content_start, section_type) in enumerate(marker_positions):
         # Find where content ends (at next marker or end of text)
         if i + 1 < len(marker_positions):
-            content_end = marker_positions[i + 1]['start']
+            content_end = marker_positions[i + 1][0]
         else:
             content_end = len(note)
         
@@ -651,10 +1064,10 @@ def extract_sections(note: str) -> Dict[str, str]:
         content = note[content_start:content_end].strip()
         
         # Remove leading punctuation/colons
-        content = re.sub(r'^[\s:;,.-]+', '', content)
+        content = _LEAD_PUNCT_RE.sub('', content)
         
         # Remove trailing punctuation but keep period if it's end of sentence
-        content = re.sub(r'[\s:;,.-]+$', '', content)
+        content = _TRAIL_PUNCT_RE.sub('', content)
         
         # Limit content length to avoid huge sections
         if len(content) > 150:
@@ -674,17 +1087,17 @@ def extract_sections(note: str) -> Dict[str, str]:
     
     # Special handling for demographics - extract age descriptor and gender
     # Try to find Pt Profile in the text
-    pt_profile_match = re.search(r'(?:\[PATIENT\]|pt|patient)\s*(?:profile)?\s*:?\s*([^.]+)', note, flags=re.IGNORECASE)
+    pt_profile_match = _PT_PROFILE_RE.search(note)
     if pt_profile_match:
         profile_text = pt_profile_match.group(1).strip()
         
         # Remove extra spaces left by clean_generic_descriptors
-        profile_text = re.sub(r'\s+', ' ', profile_text).strip()
+        profile_text = _WS_RE.sub(' ', profile_text).strip()
         
         # If profile_text is too short (only age), it was cleaned too much
         if len(profile_text) < 5:
             # Try to extract from text_lower which might have original content
-            age_match = re.search(r'(\d+)\s*(?:year|yo|y\.o\.)', text_lower)
+            age_match = _AGE_RE.search(text_lower)
             if age_match:
                 age = age_match.group(1)
                 # Look for age descriptor nearby
@@ -697,7 +1110,7 @@ def extract_sections(note: str) -> Dict[str, str]:
                     gender = "male"
                 
                 # Try to extract age descriptor
-                descriptor_match = re.search(r'(\w+\s+)?\d+\s*(?:year|yo)', note, flags=re.IGNORECASE)
+                descriptor_match = _AGE_DESCRIPTOR_RE.search(note)
                 if descriptor_match:
                     desc_text = descriptor_match.group(0)
                     if gender:
@@ -718,7 +1131,7 @@ def extract_sections(note: str) -> Dict[str, str]:
                 sections["demographics"] = f"{profile_text} - Gender: Not mentioned"
     
     # Special handling for allergies
-    if re.search(r'no\s+(?:known\s+)?allergies|nkda', text_lower):
+    if _NO_ALLERGIES_RE.search(text_lower):
         sections["allergies"] = "No known allergies"
     
     return sections
@@ -727,6 +1140,164 @@ def extract_sections(note: str) -> Dict[str, str]:
 # MAIN SUMMARIZATION FUNCTION
 # ============================================
 
+DIAGNOSTIC_QUESTION_RESPONSE = {
+    "success": False,
+    "is_diagnostic_question": True,
+    "error": "This tool is for SUMMARIZING existing clinical notes only, not for providing medical diagnosis or treatment advice.",
+    "message": "Please consult a qualified healthcare professional for medical advice.",
+    "suggestion": "This summarizer is designed to help organize and document clinical notes that have already been written. It cannot provide medical diagnosis or treatment recommendations."
+}
+
+def note_length_error(clinical_note: str) -> Optional[str]:
+    """Return an error message if the note is outside the accepted length, otherwise None"""
+    if not clinical_note or len(clinical_note) < MIN_NOTE_LENGTH:
+        return f"Note too short (minimum {MIN_NOTE_LENGTH} characters)"
+    if len(clinical_note) > MAX_NOTE_LENGTH:
+        return f"Note too long (maximum {MAX_NOTE_LENGTH} characters)"
+    return None
+
+def _validate_note(clinical_note: str, audit_trail: AuditTrail) -> Optional[Dict]:
+    """Return a failure result if the note can't be summarized, otherwise None"""
+    
+    # CHECK FOR DIAGNOSTIC QUESTIONS FIRST
+    if check_for_diagnostic_question(clinical_note):
+        audit_trail.log_event("diagnostic_question_detected", {"note": clinical_note[:50]})
+        return dict(DIAGNOSTIC_QUESTION_RESPONSE)
+    
+    # Length validation
+    error = note_length_error(clinical_note)
+    if error:
+        reason = "note_too_short" if len(clinical_note or "") < MIN_NOTE_LENGTH else "note_too_long"
+        audit_trail.log_event("validation_failed", {"reason": reason}, "error")
+        return {
+            "success": False,
+            "error": error
+        }
+    
+    return None
+
+def preprocess_note(clinical_note: str) -> Dict:
+    """
+    Run the local (non-AI) pipeline steps 1-5
+    Module-level and side-effect free so it can run in a worker process.
+    """
+    
+    # Lowercased once for every substring-style check below
+    note_lower = clinical_note.lower()
+    
+    # Steps 1-2: De-identify and expand abbreviations (one pass)
+    deidentified, expanded = deidentify_and_expand(clinical_note)
+    abbreviations_found = sum(1 for a in ABBREVIATIONS if a in note_lower)
+    
+    # Step 3: Extract sections (FIXED)
+    sections = extract_sections(expanded)
+    sections_found = sum(1 for v in sections.values() if v != "Not available")
+    
+    # Steps 4-5: Extract ICD-10 codes and check for red flags
+    icd10_codes = extract_icd10_codes(clinical_note)
+    red_flags = check_for_red_flags(clinical_note)
+    
+    return {
+        "deidentified": deidentified,
+        "abbreviations_found": abbreviations_found,
+        "expanded": expanded,
+        "sections": sections,
+        "sections_found": sections_found,
+        "icd10_codes": icd10_codes,
+        "red_flags": red_flags
+    }
+
+_preprocess_pool = None
+_preprocess_pool_lock = threading.Lock()
+
+def _get_preprocess_pool() -> Optional[ProcessPoolExecutor]:
+    """Create the preprocessing pool on first use (never at import, so that
+    spawned workers importing this module don't start pools of their own)"""
+    global _preprocess_pool
+    if PREPROCESS_WORKERS <= 0:
+        return None
+    with _preprocess_pool_lock:
+        if _preprocess_pool is None:
+            _preprocess_pool = ProcessPoolExecutor(max_workers=PREPROCESS_WORKERS)
+        return _preprocess_pool
+
+def _preprocess_note(clinical_note: str, audit_trail: AuditTrail) -> Dict:
+    """Run steps 1-5, in the preprocessing pool when one is configured"""
+    
+    pool = _get_preprocess_pool()
+    if pool is not None:
+        processed = pool.submit(preprocess_note, clinical_note).result()
+    else:
+        processed = preprocess_note(clinical_note)
+    
+    audit_trail.log_event("deidentification", {"original_length": len(clinical_note)})
+    audit_trail.log_event("abbreviation_expansion", {"abbreviations_found": processed["abbreviations_found"]})
+    audit_trail.log_event("section_extraction")
+    audit_trail.log_event("icd10_extraction")
+    audit_trail.log_event("red_flag_detection")
+    
+    return processed
+
+def _finalize_summary(clinical_note: str, processed: Dict, ai_summary: str, rag_citations: List[Dict],
+                      audit_trail: AuditTrail, metrics: MetricsCalculator,
+                      has_hallucinations: Optional[bool] = None) -> Dict:
+    """Run safety checks and scoring on the AI summary (steps 7-10) and build the result
+    has_hallucinations can be passed in when the summary was already scanned while streaming.
+    """
+    
+    rag_score = sum(c["relevance_score"] for c in rag_citations) / len(rag_citations) if rag_citations else 0.0
+    red_flags = processed["red_flags"]
+    
+    # Step 7: Check for hallucinations
+    audit_trail.log_event("hallucination_check")
+    if has_hallucinations is None:
+        has_hallucinations = check_for_hallucinations(ai_summary) if ai_summary else False
+    
+    # Step 8: Calculate metrics
+    audit_trail.log_event("metrics_calculation")
+    scores = metrics.score_pair(clinical_note, ai_summary) if ai_summary else {"rouge_score": 0.0, "bleu_score": 0.0}
+    
+    # Step 9: Generate confidence explanation
+    audit_trail.log_event("confidence_calculation")
+    confidence_data = metrics.calculate_confidence_explanation(
+        processed["sections_found"],
+        len(red_flags) > 0,
+        has_hallucinations,
+        rag_score
+    )
+    
+    # Step 10: Finalize with disclaimer
+    final_summary = ai_summary + f"\n\n**DISCLAIMER:** {DISCLAIMER}" if ai_summary else ""
+    
+    audit_trail.log_event("summarization_completed", {"success": True})
+    
+    return {
+        "success": True,
+        "original_note": clinical_note,
+        "deidentified_note": processed["deidentified"],
+        "expanded_note": processed["expanded"],
+        "sections": processed["sections"],
+        "ai_summary": ai_summary,
+        "final_summary": final_summary,
+        "is_safe": not has_hallucinations,
+        "has_red_flags": len(red_flags) > 0,
+        "red_flags": red_flags,
+        "icd10_codes": processed["icd10_codes"],
+        "rag_citations": rag_citations,
+        "confidence": confidence_data["overall_confidence"],
+        "confidence_explanation": confidence_data["explanation"],
+        "confidence_factors": confidence_data["factors"],
+        "sections_found": processed["sections_found"],
+        "metrics": {
+            "rouge_score": scores["rouge_score"],
+            "bleu_score": scores["bleu_score"],
+            "rag_grounding_score": round(rag_score, 3)
+        },
+        "audit_trail": audit_trail.get_trail(),
+        "audit_summary": audit_trail.get_summary(),
+        "timestamp": time.time()
+    }
+
 def summarize_clinical_note(clinical_note: str) -> Dict:
     """
     Main function to summarize clinical notes with all features
@@ -735,122 +1306,123 @@ def summarize_clinical_note(clinical_note: str) -> Dict:
     """
     
     audit_trail = AuditTrail()
-    rag_system = SimpleRAGSystem()
-    metrics = MetricsCalculator()
     
     audit_trail.log_event("summarization_started", {"note_length": len(clinical_note)})
     
-    # CHECK FOR DIAGNOSTIC QUESTIONS FIRST
-    if check_for_diagnostic_question(clinical_note):
-        audit_trail.log_event("diagnostic_question_detected", {"note": clinical_note[:50]})
-        return {
-            "success": False,
-            "is_diagnostic_question": True,
-            "error": "This tool is for SUMMARIZING existing clinical notes only, not for providing medical diagnosis or treatment advice.",
-            "message": "Please consult a qualified healthcare professional for medical advice.",
-            "suggestion": "This summarizer is designed to help organize and document clinical notes that have already been written. It cannot provide medical diagnosis or treatment recommendations."
-        }
+    failure = _validate_note(clinical_note, audit_trail)
+    if failure:
+        return failure
     
-    # Length validation
-    if not clinical_note or len(clinical_note) < 10:
-        audit_trail.log_event("validation_failed", {"reason": "note_too_short"}, "error")
+    try:
+        processed = _preprocess_note(clinical_note, audit_trail)
+        expanded, sections = processed["expanded"], processed["sections"]
+        
+        # Step 6: Generate AI summary with RAG (served from cache for repeat notes)
+        audit_trail.log_event("ai_summarization", {"rag_enabled": True})
+        ai_summary = ""
+        rag_citations = []
+        
+        if GITHUB_TOKEN:
+            cache_key = summary_cache.make_key(expanded, sections)
+            cached = summary_cache.get(cache_key)
+            audit_trail.log_event("summary_cache_lookup", {"hit": cached is not None})
+            if cached is not None:
+                ai_summary, rag_citations = cached
+            else:
+                ai_summary, rag_citations = hybrid_summarize_with_rag(expanded, rag_system, sections)
+                if ai_summary and not ai_summary.startswith(API_ERROR_PREFIXES):
+                    summary_cache.set(cache_key, (ai_summary, rag_citations))
+        
+        return _finalize_summary(clinical_note, processed, ai_summary, rag_citations, audit_trail, metrics_calculator)
+        
+    except Exception as e:
+        audit_trail.log_event("error", {"error": str(e)}, "error")
         return {
             "success": False,
-            "error": "Note too short (minimum 10 characters)"
+            "error": f"Error processing note: {str(e)}",
+            "audit_trail": audit_trail.get_trail()
         }
+
+def summarize_clinical_notes_batch(notes: List[str], max_workers: int = 8) -> List[Dict]:
+    """
+    Summarize many notes (e.g. a bulk EHR extract), returning results in input order
+    Notes run concurrently on a thread pool so their API calls overlap; with
+    BATCH_MAX_SIZE > 1 the concurrent calls are also coalesced by summary_batcher.
+    """
+    if not notes:
+        return []
     
-    if len(clinical_note) > 5000:
-        audit_trail.log_event("validation_failed", {"reason": "note_too_long"}, "error")
-        return {
-            "success": False,
-            "error": "Note too long (maximum 5000 characters)"
-        }
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(notes))) as pool:
+        return list(pool.map(summarize_clinical_note, notes))
+
+def summarize_clinical_note_stream(clinical_note: str) -> Iterator[Tuple[str, Dict]]:
+    """
+    Streaming variant of summarize_clinical_note
+    Yields (event, data) pairs: "sections" once the local steps finish, "delta" for
+    each piece of AI summary text, and finally "done" with the same result dict
+    summarize_clinical_note would have returned.
+    """
+    
+    audit_trail = AuditTrail()
+    
+    audit_trail.log_event("summarization_started", {"note_length": len(clinical_note), "streaming": True})
+    
+    failure = _validate_note(clinical_note, audit_trail)
+    if failure:
+        yield "done", failure
+        return
     
     try:
-        # Step 1: De-identify
-        audit_trail.log_event("deidentification", {"original_length": len(clinical_note)})
-        deidentified = deidentify_text(clinical_note)
-        
-        # Step 2: Expand abbreviations
-        audit_trail.log_event("abbreviation_expansion", {"abbreviations_found": len([a for a in ABBREVIATIONS if a in clinical_note.lower()])})
-        expanded = expand_abbreviations(deidentified)
-        
-        # Step 3: Extract sections (FIXED)
-        audit_trail.log_event("section_extraction", {})
-        sections = extract_sections(expanded)
-        sections_found = sum(1 for v in sections.values() if v != "Not available")
-        
-        # Step 4: Extract ICD-10 codes
-        audit_trail.log_event("icd10_extraction", {})
-        icd10_codes = extract_icd10_codes(clinical_note)
-        
-        # Step 5: Check for red flags
-        audit_trail.log_event("red_flag_detection", {})
-        red_flags = check_for_red_flags(clinical_note)
+        processed = _preprocess_note(clinical_note, audit_trail)
+        expanded, sections = processed["expanded"], processed["sections"]
+        yield "sections", {
+            "sections": sections,
+            "sections_found": processed["sections_found"],
+            "has_red_flags": len(processed["red_flags"]) > 0,
+            "red_flags": processed["red_flags"]
+        }
         
-        # Step 6: Generate AI summary with RAG
+        # Step 6: Stream AI summary with RAG (served from cache for repeat notes)
         audit_trail.log_event("ai_summarization", {"rag_enabled": True})
         ai_summary = ""
         rag_citations = []
-        rag_score = 0.0
+        # Hallucination check runs on each piece as it arrives, not after the stream ends
+        scanner = HallucinationScanner()
         
         if GITHUB_TOKEN:
-            ai_summary, rag_citations = hybrid_summarize_with_rag(expanded, rag_system, sections)
-            rag_score = sum(c["relevance_score"] for c in rag_citations) / len(rag_citations) if rag_citations else 0.0
-        
-        # Step 7: Check for hallucinations
-        audit_trail.log_event("hallucination_check", {})
-        has_hallucinations = check_for_hallucinations(ai_summary) if ai_summary else False
-        
-        # Step 8: Calculate metrics
-        audit_trail.log_event("metrics_calculation", {})
-        rouge_score = metrics.calculate_rouge_score(clinical_note, ai_summary) if ai_summary else 0.0
-        bleu_score = metrics.calculate_bleu_score(clinical_note, ai_summary) if ai_summary else 0.0
-        
-        # Step 9: Generate confidence explanation
-        audit_trail.log_event("confidence_calculation", {})
-        confidence_data = metrics.calculate_confidence_explanation(
-            sections_found,
-            len(red_flags) > 0,
-            has_hallucinations,
-            rag_score
-        )
-        
-        # Step 10: Finalize with disclaimer
-        final_summary = ai_summary + f"\n\n**DISCLAIMER:** {DISCLAIMER}" if ai_summary else ""
+            cache_key = summary_cache.make_key(expanded, sections)
+            cached = summary_cache.get(cache_key)
+            audit_trail.log_event("summary_cache_lookup", {"hit": cached is not None})
+            if cached is not None:
+                ai_summary, rag_citations = cached
+                scanner.feed(ai_summary)
+                yield "delta", {"text": ai_summary}
+            else:
+                prompt, rag_citations = build_rag_prompt(expanded, rag_system, sections)
+                parts = []
+                complete = True
+                try:
+                    for delta in stream_github_models_api(prompt):
+                        parts.append(delta)
+                        scanner.feed(delta)
+                        yield "delta", {"text": delta}
+                except requests.exceptions.RequestException as e:
+                    # Show the error after whatever text arrived, but never cache a cut-off summary
+                    complete = False
+                    error = f"API Error: {str(e)}"
+                    parts.append(error)
+                    scanner.feed(error)
+                    yield "delta", {"text": error}
+                ai_summary = "".join(parts)
+                if complete and ai_summary and not ai_summary.startswith(API_ERROR_PREFIXES):
+                    summary_cache.set(cache_key, (ai_summary, rag_citations))
         
-        audit_trail.log_event("summarization_completed", {"success": True})
-        
-        return {
-            "success": True,
-            "original_note": clinical_note,
-            "deidentified_note": deidentified,
-            "expanded_note": expanded,
-            "sections": sections,
-            "ai_summary": ai_summary,
-            "final_summary": final_summary,
-            "is_safe": not has_hallucinations,
-            "has_red_flags": len(red_flags) > 0,
-            "red_flags": red_flags,
-            "icd10_codes": icd10_codes,
-            "rag_citations": rag_citations,
-            "confidence": confidence_data["overall_confidence"],
-            "confidence_explanation": confidence_data["explanation"],
-            "confidence_factors": confidence_data["factors"],
-            "sections_found": sections_found,
-            "metrics": {
-                "rouge_score": rouge_score,
-                "bleu_score": bleu_score,
-                "rag_grounding_score": round(rag_score, 3)
-            },
-            "audit_trail": audit_trail.get_trail(),
-            "audit_summary": audit_trail.get_summary(),
-            "timestamp": time.time()
-        }
+        yield "done", _finalize_summary(clinical_note, processed, ai_summary, rag_citations, audit_trail, metrics_calculator,
+                                        has_hallucinations=scanner.found)
         
     except Exception as e:
         audit_trail.log_event("error", {"error": str(e)}, "error")
-        return {
+        yield "done", {
             "success": False,
             "error": f"Error processing note: {str(e)}",
             "audit_trail": audit_trail.get_trail()
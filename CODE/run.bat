@@ -18,6 +18,6 @@ echo Press Ctrl+C to stop the server
 echo ============================================================
 echo.
 
-python APP_WEB_IMPROVED.py
+hypercorn --config hypercorn.toml wsgi:app:app
 
 pause
@@ -18,4 +18,4 @@ echo "Press Ctrl+C to stop the server"
 echo "============================================================"
 echo ""
 
-python3 APP_WEB_IMPROVED.py
+hypercorn --config hypercorn.toml wsgi:app:app